@@ -8,16 +8,71 @@ Mavlink documentation: https://github.com/mavlink/mavlink/blob/master/message_de
 """
 
 import argparse
+import functools
+import math
+from concurrent.futures import ProcessPoolExecutor
 from plan_converter import MavImageOptions, PlanConverter
 
 
+def plan_file(value):
+    """
+    Argparse type to ensure path is a .plan file
+    """
+    if not value.endswith(".plan"):
+        raise argparse.ArgumentTypeError(
+            "{!r} is not a .plan file, use --out_path to set the output path".format(value)
+        )
+    return value
+
+
+def float_range(low, high=math.inf):
+    """
+    Create argparse type that converts to float and ensures value is within [low, high]
+    """
+
+    def to_float(value):
+        try:
+            value = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError("invalid float value: {!r}".format(value))
+        if not low <= value <= high:
+            limits = "min={}".format(low)
+            if high != math.inf:
+                limits += ", max={}".format(high)
+            raise argparse.ArgumentTypeError("{} is out of range, {}".format(value, limits))
+        return value
+
+    return to_float
+
+
+def home_location(value):
+    """
+    Argparse type to convert "lon,lat" or "lon,lat,alt" string to tuple of floats
+    """
+    try:
+        home = tuple(float(i) for i in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid home location: {!r}".format(value))
+    if len(home) not in (2, 3):
+        raise argparse.ArgumentTypeError(
+            "home location needs 2 or 3 values, got {}: {!r}".format(len(home), value)
+        )
+    return home
+
+
 parser = argparse.ArgumentParser(
     prog="main.py",
     description="Convert a QGroundControl-created .plan file \
     into a QGC WPL 120 flight plan that control the Parrot Anafi",
 )
 
-parser.add_argument("plan_path", help="Path to .plan file to convert", type=str)
+parser.add_argument(
+    "plan_path",
+    nargs="+",
+    help="Path to .plan file to convert \
+    Multiple files can be given, which are converted in parallel",
+    type=plan_file,
+)
 
 parser.add_argument(
     "--out_path",
@@ -25,7 +80,8 @@ parser.add_argument(
     action="store",
     default=None,
     help="Path to save output file \
-    DEFAULT: same name/path as .plan file with .txt extension",
+    DEFAULT: same name/path as .plan file with .txt extension \
+    NOTE: can only be used when converting a single .plan file",
     type=str,
     dest="out_path",
 )
@@ -43,8 +99,8 @@ parser.add_argument(
     Using 3 values will instead set the altitude of the third value \
     DEFAULT: use home location set in .plan \
     NOTE: will error if no home location set in .plan file and this value is not set \
-    Inputs MUST be quoted and without brackets or spaces',
-    type=str,
+    Inputs MUST be quoted and without brackets',
+    type=home_location,
     dest="force_home",
 )
 
@@ -54,7 +110,7 @@ parser.add_argument(
     default=3.0,
     help="Set speed for takeoff \
     DEFAULT: 3.0, min=1.0, max=10.0",
-    type=float,
+    type=float_range(1.0, 10.0),
     dest="speed_takeoff",
 )
 
@@ -64,7 +120,7 @@ parser.add_argument(
     default=3.0,
     help="Set speed for flying between waypoints \
     DEFAULT: 3.0, min=1.0, max=10.0",
-    type=float,
+    type=float_range(1.0, 10.0),
     dest="speed_flying",
 )
 
@@ -74,7 +130,7 @@ parser.add_argument(
     default=2.0,
     help="Set speed for landing \
     DEFAULT: 2.0, min=1.0, max=10.0",
-    type=float,
+    type=float_range(1.0, 10.0),
     dest="speed_landing",
 )
 
@@ -84,7 +140,7 @@ parser.add_argument(
     default=2.0,
     help="Acceptance radius for arriving at each waypoint \
     DEFAULT: 2.0",
-    type=float,
+    type=float_range(0.0),
     dest="waypoint_radius",
 )
 
@@ -94,7 +150,7 @@ parser.add_argument(
     default=1.0,
     help="Time to wait after arriving at each waypoint \
     DEFAULT: 1.0",
-    type=float,
+    type=float_range(0.0),
     dest="waypoint_time",
 )
 
@@ -122,7 +178,7 @@ parser.add_argument(
     default=-90.0,
     help="Angle to tilt the gimbal (negative values are down) \
     DEFAULT: -90.0, min=-90.0, max=90.0",
-    type=float,
+    type=float_range(-90.0, 90.0),
     dest="gimbal_angle",
 )
 
@@ -132,7 +188,7 @@ parser.add_argument(
     default=20.0,
     help="Time to wait before takeoff, allowing user to connect with Freeflight app \
     DEFAULT: 20.0",
-    type=float,
+    type=float_range(0.0),
     dest="initial_wait",
 )
 
@@ -152,6 +208,8 @@ __doc__ += "\n" + parser.format_help()
 
 def main():
     args = parser.parse_args()
+    if args.out_path is not None and len(args.plan_path) > 1:
+        parser.error("--out_path can only be used when converting a single .plan file")
     pc = PlanConverter(
         speed_takeoff=args.speed_takeoff,
         speed_flying=args.speed_flying,
@@ -163,9 +221,14 @@ def main():
         waypoint_radius=args.waypoint_radius,
         track_yaw=args.track_yaw,
     )
-    # convert string home to list of floats
-    home = [float(i.strip("")) for i in args.force_home.split(",")] if args.force_home else None
-    pc.convert_plan(args.plan_path, out_path=args.out_path, force_home=home)
+    convert = functools.partial(pc.convert_plan, out_path=args.out_path, force_home=args.force_home)
+    if len(args.plan_path) == 1:
+        convert(args.plan_path[0])
+    else:
+        # files are independent, convert across processes
+        with ProcessPoolExecutor() as executor:
+            # NOTE: consume results so any errors from workers are raised
+            list(executor.map(convert, args.plan_path))
     print("Done.")
 
 
@@ -3,9 +3,31 @@ Class to convert QGroundControl .plan file and convert to QGC WPL 120 format
 """
 
 import os
-import json
 import math
 
+# use fastest available JSON parser, all return the same dict/list/float tree
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+# stream .plan items one at a time if available, keeps memory low for large plans
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# lazily parse large .plan files with simdjson if available, only used when ijson is not
+# NOTE: for small files the overhead outweighs the faster parse, so use _json instead
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+_SIMDJSON_MIN_SIZE = 256 * 1024
+
 
 class MavCommand:
     """
@@ -65,7 +87,51 @@ class MavImageOptions:
     RAW = 14.0
 
 
+# image modes accepted by PlanConverter
+_VALID_IMAGE_MODES = frozenset(
+    [
+        MavImageOptions.SNAPSHOT,
+        MavImageOptions.JPEG,
+        MavImageOptions.JPEG_FISHEYE,
+        MavImageOptions.RAW,
+    ]
+)
+
+
+class _Conversion:
+    """
+	Values tracked while converting a single .plan file
+	"""
+
+    __slots__ = (
+        "home",
+        "home_flying_altitude",
+        "first_waypoint_altitude",
+        "current_waypoint",
+        "current_step",
+    )
+
+    def __init__(self):
+        self.home = []
+        self.home_flying_altitude = None
+        self.first_waypoint_altitude = None
+        self.current_waypoint = ()
+        self.current_step = 0
+
+
 class PlanConverter:
+    __slots__ = (
+        "speed_takeoff",
+        "speed_flying",
+        "speed_landing",
+        "image_mode",
+        "gimbal_angle",
+        "initial_wait",
+        "waypoint_time",
+        "waypoint_radius",
+        "track_yaw",
+    )
+
     def __init__(
         self,
         speed_takeoff=3.0,
@@ -82,20 +148,21 @@ class PlanConverter:
 		Class to parse .plan file and convert to QGC WPL 120 format
 		"""
         # ensure valid input paramters
-        assert speed_takeoff >= 1.0 and speed_takeoff <= 10.0
-        assert speed_flying >= 1.0 and speed_flying <= 10.0
-        assert speed_landing >= 1.0 and speed_landing <= 10.0
+        # NOTE: checked explicitly rather than with assert so they are not skipped by python -O
+        for name, value, low, high in (
+            ("speed_takeoff", speed_takeoff, 1.0, 10.0),
+            ("speed_flying", speed_flying, 1.0, 10.0),
+            ("speed_landing", speed_landing, 1.0, 10.0),
+            ("gimbal_angle", gimbal_angle, -90.0, 90.0),
+            ("initial_wait", initial_wait, 0.0, math.inf),
+            ("waypoint_time", waypoint_time, 0.0, math.inf),
+            ("waypoint_radius", waypoint_radius, 0.0, math.inf),
+        ):
+            if not low <= value <= high:
+                raise ValueError('Invalid input for "{}," got {}'.format(name, value))
         # NOTE: should be handled by argparse, but let's be sure
-        assert image_mode in [
-            MavImageOptions.SNAPSHOT,
-            MavImageOptions.JPEG,
-            MavImageOptions.JPEG_FISHEYE,
-            MavImageOptions.RAW,
-        ]
-        assert gimbal_angle >= -90.0 and gimbal_angle <= 90.0
-        assert initial_wait >= 0.0
-        assert waypoint_time >= 0.0
-        assert waypoint_radius >= 0.0
+        if image_mode not in _VALID_IMAGE_MODES:
+            raise ValueError('Invalid input for "image_mode," got {}'.format(image_mode))
         self.speed_takeoff = speed_takeoff
         self.speed_flying = speed_flying
         self.speed_landing = speed_landing
@@ -105,127 +172,159 @@ class PlanConverter:
         self.waypoint_time = waypoint_time
         self.waypoint_radius = waypoint_radius
         self.track_yaw = track_yaw
-        # internally tracked objects
-        self.current_waypoint = []
-        self.home = []
-        self.home_flying_altitude = None
-        self.current_step = 0
 
     def convert_plan(self, plan_path, out_path=None, force_home=None):
         """
 		Convert a .plan file to QGC WPL format
+		NOTE: values tracked during conversion are kept in a _Conversion, not on self
 		"""
         assert plan_path.endswith(".plan")
         if out_path is None:
             out_path = plan_path.split(".plan")[0] + ".txt"
-        with open(plan_path) as fp:
-            plan_dict = json.load(fp)
+        ctx = _Conversion()
+        planned_home, plan_items = self._load_plan(plan_path, force_home)
         # get home location for initial waypoint from .plan or overriden value
-        self.home = self._get_home_location(plan_dict, force_home)
+        ctx.home = self._get_home_location(ctx, planned_home, force_home)
         # TODO: ensure home is close to first waypoint
-        cmd_ls = self._set_initial_commands()
-        # iterate through plan items
-        cmd_ls += self._parse_plan_list(plan_dict)
-        # final commands - fly back to home position, set landing speed, land
-        cmd_ls += self._set_final_commands()
-        # convert cmd list to string, add version 120 at top
-        cmd_str = "QGC WPL 120\r\n"
-        for item_list in cmd_ls:
-            if item_list is not None:
-                cmd_str += self._list_to_string(item_list)
-        # TODO: line is from inspiration source, determine if needed
-        cmd_str = cmd_str.strip() + "\r\n"  # add back the final newline
-        # write file to disk
-        with open(out_path, "w") as fp:
-            fp.write(cmd_str)
-        # reset values
-        self._reset_values()
-
-    def _get_home_location(self, plan_dict, force_home):
+        # write to a temporary file next to out_path, only replace out_path once fully converted
+        # NOTE: avoids leaving a partial flight plan (no return home/land) if conversion fails
+        tmp_path = "{}.{}.tmp".format(out_path, os.getpid())
+        try:
+            self._write_plan(ctx, tmp_path, plan_items)
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_plan(self, ctx, out_path, plan_items):
+        """
+		Write QGC WPL rows to out_path as they are created
+		"""
+        # large buffer to limit syscalls
+        with open(out_path, "w", buffering=1024 * 1024) as fp:
+            # add version 120 at top
+            fp.write("QGC WPL 120\r\n")
+            # hold initial commands until altitude of home waypoint is known
+            pending = self._set_initial_commands(ctx)
+            # iterate through plan items
+            for item_list in self._parse_plan_list(ctx, plan_items):
+                if not pending:
+                    self._write_list(ctx, fp, item_list)
+                    continue
+                pending.append(item_list)
+                # use altitude of first waypoint for home waypoints if not set by force_home
+                if ctx.home_flying_altitude is None and ctx.first_waypoint_altitude is not None:
+                    self._set_home_altitude(ctx, pending)
+                if ctx.home_flying_altitude is not None:
+                    for pending_list in pending:
+                        self._write_list(ctx, fp, pending_list)
+                    pending = []
+            if ctx.home_flying_altitude is None:
+                self._set_home_altitude(ctx, pending)
+            # final commands - fly back to home position, set landing speed, land
+            for item_list in pending + self._set_final_commands(ctx):
+                self._write_list(ctx, fp, item_list)
+
+    def _load_plan(self, plan_path, force_home=None):
+        """
+		Get planned home position and an iterable of mission items from .plan file
+		NOTE: items are streamed with ijson if installed, otherwise whole file is loaded
+		"""
+        if ijson is not None:
+            planned_home = None
+            if force_home is None:
+                # NOTE: full pass over the file, QGC writes "plannedHomePosition" after "items"
+                # only the home position value is built, so memory stays low
+                with open(plan_path, "rb") as fp:
+                    planned_home = next(
+                        ijson.items(fp, "mission.plannedHomePosition", use_float=True), None
+                    )
+            return planned_home, self._stream_plan_items(plan_path)
+        # NOTE: read as bytes, orjson parses UTF-8 directly and has no load() for file objects
+        with open(plan_path, "rb") as fp:
+            plan_bytes = fp.read()
+        if simdjson is not None and len(plan_bytes) >= _SIMDJSON_MIN_SIZE:
+            # NOTE: new parser per file, a parser only holds one document at a time
+            mission = simdjson.Parser().parse(plan_bytes)["mission"]
+        else:
+            mission = _json.loads(plan_bytes)["mission"]
+        return mission.get("plannedHomePosition"), mission["items"]
+
+    def _stream_plan_items(self, plan_path):
         """
-		Ensure home is valid if force_home used, otherwise pull home location from .plan file
-		NOTE: use altitude of first waypoint if none is provided by force_home
+		Lazily yield mission items from .plan file, one at a time
+		"""
+        with open(plan_path, "rb") as fp:
+            yield from ijson.items(fp, "mission.items.item", use_float=True)
+
+    def _get_home_location(self, ctx, planned_home, force_home):
+        """
+		Ensure home is valid if force_home used, otherwise use home location from .plan file
+		NOTE: altitude of first waypoint is used later if none is provided by force_home
 		"""
         if force_home is not None:
-            # ensure force_home set correctly - list of 2 values
+            # ensure force_home set correctly - list/tuple of 2 values
             # NOTE: could be set to 3 values if starting/ending altitude differ from flight plan
-            try:
-                assert type(force_home) == list and (len(force_home) == 2 or len(force_home) == 3)
-                home = force_home
-                if len(home) == 3:
-                    self.home_flying_altitude = home[2]
-                    home = home[:2]
-            except AssertionError as e:
-                raise AssertionError('Invalid input for "force_home," got {}'.format(force_home))
+            # NOTE: checked explicitly rather than with assert so it is not skipped by python -O
+            if not (isinstance(force_home, (list, tuple)) and len(force_home) in (2, 3)):
+                raise ValueError('Invalid input for "force_home," got {}'.format(force_home))
+            home = force_home
+            if len(home) == 3:
+                ctx.home_flying_altitude = home[2]
+                home = home[:2]
         else:
-            # extract home position from plan, fail if not found
+            # use home position from plan, fail if not found
             # NOTE: home in order [lat, lon, alt], rearrange as [lon, lat] to remain consistent with force_home - removing alt
-            try:
-                tmp_home = plan_dict["mission"]["plannedHomePosition"]
-                home = [tmp_home[1], tmp_home[0]]
-            except KeyError as e:
+            if planned_home is None:
                 raise KeyError(
                     'No "plannedHomePosition" could be found in .plan file, set it in QGC or override with "force_home" value'
                 )
-        if self.home_flying_altitude is None:
-            first_waypoint = self._initial_waypoint(plan_dict)
-            self.home_flying_altitude = float(first_waypoint[-1])
+            home = [planned_home[1], planned_home[0]]
         return home
 
-    def _initial_waypoint(self, plan_dict):
+    def _set_home_altitude(self, ctx, cmd_ls):
         """
-		Get initial waypoint from .plan file
-		Use to check distance from home and include altitude for initial home waypoint
+		Set home altitude from first waypoint found while parsing .plan items
+		Back-fill altitude of initial home waypoint, which was created before it was known
 		"""
-        for item in plan_dict["mission"]["items"]:
-            # handle for set of items
-            if "TransectStyleComplexItem" in item:
-                for sub_item in item["TransectStyleComplexItem"]["Items"]:
-                    if sub_item["command"] == MavCommand.MAV_CMD_NAV_WAYPOINT:
-                        return sub_item["params"][4:]
-            # handle for single item
-            elif "params" in item:
-                if item["command"] == MavCommand.MAV_CMD_NAV_WAYPOINT:
-                    return item["params"][4:]
-        # NOTE: this exception should theoretically NEVER hit...
-        raise KeyError("Could not find any waypoints in .plan file, what the hell did you do?")
+        if ctx.first_waypoint_altitude is None:
+            # NOTE: this exception should theoretically NEVER hit...
+            raise KeyError("Could not find any waypoints in .plan file, what the hell did you do?")
+        ctx.home_flying_altitude = float(ctx.first_waypoint_altitude)
+        for item_list in cmd_ls:
+            if item_list is not None and item_list[10] is None:
+                item_list[10] = ctx.home_flying_altitude
 
     def _item_to_list(self, item):
         """
 		Convert a .plan file item to a list for QGC QPL format
 		NOTE: forcing None entries to 0.0
 		"""
+        params = [0.0 if param is None else float(param) for param in item["params"][:7]]
         return [
-            self.current_step,
+            None,  # step, set when written
             0,  # HARDCODED as 0
             3,  # HARDCODED as 3 - don't fully understand, different in .plan, all 3's in converted version from app, if using .plan's use item['frame']
             item["command"],
-            float(item["params"][0]) if item["params"][0] != None else 0.0,
-            float(item["params"][1]) if item["params"][1] != None else 0.0,
-            float(item["params"][2]) if item["params"][2] != None else 0.0,
-            float(item["params"][3]) if item["params"][3] != None else 0.0,
-            float(item["params"][4]) if item["params"][4] != None else 0.0,
-            float(item["params"][5]) if item["params"][5] != None else 0.0,
-            float(item["params"][6]) if item["params"][6] != None else 0.0,
+            *params,
             1 if item["autoContinue"] else 0,  # always use 1 and just hardcode?
         ]
 
-    def _format_list(self, item_list):
+    def _post_process(self, ctx, item_list):
         """
-		Format list entry by incrementing step and handling any commands that need further work 
+		Handle any commands that need further work
+		NOTE: step is not set here, it is assigned when the item list is written
 		"""
-        self.current_step += 1
         # handle for commands requiring alteration
         cmd = int(item_list[3])
-        command_dict = {
-            MavCommand.MAV_CMD_IMAGE_START_CAPTURE: self._handle_picture,
-            MavCommand.MAV_CMD_NAV_WAYPOINT: self._handle_waypoint,
-            MavCommand.MAV_CMD_NAV_RETURN_TO_LAUNCH: self._handle_rth,
-        }
-        try:
-            return command_dict[cmd](item_list)
-        except KeyError:
-            return item_list
+        if cmd == MavCommand.MAV_CMD_NAV_WAYPOINT:
+            return self._handle_waypoint(ctx, item_list)
+        elif cmd == MavCommand.MAV_CMD_IMAGE_START_CAPTURE:
+            return self._handle_picture(item_list)
+        elif cmd == MavCommand.MAV_CMD_NAV_RETURN_TO_LAUNCH:
+            return self._handle_rth(item_list)
+        return item_list
 
     def _handle_picture(self, item_list):
         """
@@ -235,14 +334,14 @@ class PlanConverter:
         item_list[6] = self.image_mode
         return item_list
 
-    def _handle_waypoint(self, item_list):
+    def _handle_waypoint(self, ctx, item_list):
         """
 		Handle for waypoint command
 		"""
         item_list[4] = self.waypoint_time
         item_list[5] = self.waypoint_radius
         if self.track_yaw:
-            item_list[10] = self._angle_to_next_pt(item_list)
+            item_list[7] = self._angle_to_next_pt(ctx, item_list)
         return item_list
 
     def _handle_rth(self, item_list):
@@ -251,233 +350,128 @@ class PlanConverter:
 		NOTE: we don't understand this command, seems to always fail
 		for now just remove since we add an explicit waypoint for home anyways
 		"""
-        # NOTE: need to decrement otherwise there'll be a missing number near the end
-        self.current_step -= 1
         return None
 
-    def _angle_to_next_pt(self, item_list):
+    def _angle_to_next_pt(self, ctx, item_list):
         """
-		Calculate the angle (in degrees) from self.current_waypoint to next point
+		Calculate the angle (in degrees) from ctx.current_waypoint to next point
 		NOTE: not compensating for distortion, angles calculated to the RIGHT (clockwise)	
 		"""
         # NOTE: positions swapped since spec requires lat/lon order
-        next_pt = [item_list[9], item_list[8]]
+        next_lon, next_lat = item_list[9], item_list[8]
+        current_waypoint = ctx.current_waypoint
         # handle for initial point - just use 0
-        if len(self.current_waypoint[0]) == 0:
-            yaw = 0
+        if not current_waypoint:
+            yaw = 0.0
         else:
-            x_offset = self.current_waypoint[0] - next_pt[0]
-            y_offset = self.current_waypoint[1] - next_pt[1]
-            yaw = (360 + math.degrees(math.atan2(x_offset, y_offset))) % 360
-        self.current_waypoint = next_pt
+            lon_offset = next_lon - current_waypoint[0]
+            lat_offset = next_lat - current_waypoint[1]
+            yaw = math.degrees(math.atan2(lon_offset, lat_offset) % math.tau)
+        ctx.current_waypoint = (next_lon, next_lat)
         return yaw
 
-    def _set_initial_commands(self):
+    def _make_list(self, command, p1=0.0, p2=0.0, p3=0.0, p4=0.0, x=0.0, y=0.0, z=0.0):
+        """
+		Create a list representation of a command, step is set when written
+		NOTE: x/y/z are lat/lon/alt for navigation commands, unused params default to 0.0
+		"""
+        return [None, 0, 3, command, p1, p2, p3, p4, x, y, z, 1]
+
+    def _set_initial_commands(self, ctx):
         """
 		Set initial item lists for start of flight plan
 		Takeoff speed, wait, gimbal, image type, launch, waypoint of home, flying speed
 		"""
+        home_lon, home_lat = ctx.home[0], ctx.home[1]
         cmd_ls = []
         # set takeoff speed
-        speed1 = [
-            self.current_step,
-            0,
-            3,
-            MavCommand.MAV_CMD_DO_CHANGE_SPEED,
-            1.0,
-            self.speed_takeoff,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            1,
-        ]
-        cmd_ls.append(self._format_list(speed1))
+        speed1 = self._make_list(MavCommand.MAV_CMD_DO_CHANGE_SPEED, 1.0, self.speed_takeoff)
+        cmd_ls.append(self._post_process(ctx, speed1))
         # set initial delay, if there is one
         if self.initial_wait > 0:
-            delay = [
-                self.current_step,
-                0,
-                3,
-                MavCommand.MAV_CMD_NAV_DELAY,
-                self.initial_wait,
-                0.0,
-                0.0,
-                0.0,
-                0.0,
-                0.0,
-                0.0,
-                1,
-            ]
-            cmd_ls.append(self._format_list(delay))
+            delay = self._make_list(MavCommand.MAV_CMD_NAV_DELAY, self.initial_wait)
+            cmd_ls.append(self._post_process(ctx, delay))
         # set image mode
-        mode = [
-            self.current_step,
-            0,
-            3,
+        mode = self._make_list(
             MavCommand.MAV_CMD_SET_STILL_CAPTURE_MODE,
             MavCaptureMode.STILL_CAPTURE_MODE_TYPE_GPS_POSITION,
             self.waypoint_radius,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            1,
-        ]
-        cmd_ls.append(self._format_list(mode))
+        )
+        cmd_ls.append(self._post_process(ctx, mode))
         # set gimbal position
-        gimbal = [
-            self.current_step,
-            0,
-            3,
-            MavCommand.MAV_CMD_DO_MOUNT_CONTROL,
-            self.gimbal_angle,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            2.0,
-            1,
-        ]
-        cmd_ls.append(self._format_list(gimbal))
+        gimbal = self._make_list(MavCommand.MAV_CMD_DO_MOUNT_CONTROL, self.gimbal_angle, z=2.0)
+        cmd_ls.append(self._post_process(ctx, gimbal))
         # use explicit launch, does not seem to be necessary, but probably better to do
-        launch = [
-            self.current_step,
-            0,
-            3,
-            MavCommand.MAV_CMD_NAV_TAKEOFF,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            1,
-        ]
-        cmd_ls.append(self._format_list(launch))
+        launch = self._make_list(MavCommand.MAV_CMD_NAV_TAKEOFF)
+        cmd_ls.append(self._post_process(ctx, launch))
         # initial waypoint at home, uses altitude of first wayoint if one not set in force_home
-        home1 = [
-            self.current_step,
-            0,
-            3,
-            MavCommand.MAV_CMD_NAV_WAYPOINT,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            self.home[1],
-            self.home[0],
-            self.home_flying_altitude,
-            1,
-        ]
-        cmd_ls.append(self._format_list(home1))
+        home1 = self._make_list(
+            MavCommand.MAV_CMD_NAV_WAYPOINT, x=home_lat, y=home_lon, z=ctx.home_flying_altitude
+        )
+        cmd_ls.append(self._post_process(ctx, home1))
         # set flying speed, if different from takeoff speed
         if self.speed_flying != self.speed_takeoff:
-            speed2 = [
-                self.current_step,
-                0,
-                3,
-                MavCommand.MAV_CMD_DO_CHANGE_SPEED,
-                1.0,
-                self.speed_flying,
-                0.0,
-                0.0,
-                0.0,
-                0.0,
-                0.0,
-                1,
-            ]
-            cmd_ls.append(self._format_list(speed2))
+            speed2 = self._make_list(MavCommand.MAV_CMD_DO_CHANGE_SPEED, 1.0, self.speed_flying)
+            cmd_ls.append(self._post_process(ctx, speed2))
         return cmd_ls
 
-    def _parse_plan_list(self, plan_dict):
+    def _parse_plan_list(self, ctx, plan_items):
         """
-		Parse .plan dictionary items for items
+		Parse .plan mission items for items, yielding each item list as it is created
+		Also track altitude of first waypoint, used for home waypoints
 		"""
-        cmd_ls = []
+        # NOTE: bind to locals, looked up once per item
+        waypoint_cmd = MavCommand.MAV_CMD_NAV_WAYPOINT
+        item_to_list = self._item_to_list
+        post_process = self._post_process
         # iterate through plan items
-        for item in plan_dict["mission"]["items"]:
+        for item in plan_items:
             # handle for set of items
             if "TransectStyleComplexItem" in item:
-                for sub_item in item["TransectStyleComplexItem"]["Items"]:
-                    cmd_ls.append(self._format_list(self._item_to_list(sub_item)))
+                sub_items = item["TransectStyleComplexItem"]["Items"]
             # handle for single item
             elif "params" in item:
-                cmd_ls.append(self._format_list(self._item_to_list(item)))
-        return cmd_ls
+                sub_items = [item]
+            else:
+                continue
+            for sub_item in sub_items:
+                if ctx.first_waypoint_altitude is None and sub_item["command"] == waypoint_cmd:
+                    ctx.first_waypoint_altitude = sub_item["params"][6]
+                yield post_process(ctx, item_to_list(sub_item))
 
-    def _set_final_commands(self):
+    def _set_final_commands(self, ctx):
         """
 		Set final item lists for end of flight plan
 		Waypoint of home, landing speed, land 
 		"""
+        home_lon, home_lat = ctx.home[0], ctx.home[1]
         cmd_ls = []
         # fly back to home position
-        home2 = [
-            self.current_step,
-            0,
-            3,
-            MavCommand.MAV_CMD_NAV_WAYPOINT,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            self.home[1],
-            self.home[0],
-            self.home_flying_altitude,
-            1,
-        ]
-        cmd_ls.append(self._format_list(home2))
+        home2 = self._make_list(
+            MavCommand.MAV_CMD_NAV_WAYPOINT, x=home_lat, y=home_lon, z=ctx.home_flying_altitude
+        )
+        cmd_ls.append(self._post_process(ctx, home2))
         # set landing speed, if different from flying speed
         if self.speed_flying != self.speed_landing:
-            speed3 = [
-                self.current_step,
-                0,
-                3,
-                MavCommand.MAV_CMD_DO_CHANGE_SPEED,
-                1.0,
-                self.speed_landing,
-                0.0,
-                0.0,
-                0.0,
-                0.0,
-                0.0,
-                1,
-            ]
-            cmd_ls.append(self._format_list(speed3))
+            speed3 = self._make_list(MavCommand.MAV_CMD_DO_CHANGE_SPEED, 1.0, self.speed_landing)
+            cmd_ls.append(self._post_process(ctx, speed3))
         # give explicit land
-        land = [
-            self.current_step,
-            0,
-            3,
-            MavCommand.MAV_CMD_NAV_LAND,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            1,
-        ]
-        cmd_ls.append(self._format_list(land))
+        land = self._make_list(MavCommand.MAV_CMD_NAV_LAND)
+        cmd_ls.append(self._post_process(ctx, land))
         return cmd_ls
 
     def _list_to_string(self, item_list):
         """
 		Convert a list representation of command items to string
 		"""
-        return "\t".join([str(i) for i in item_list]) + "\r\n"
+        return "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\r\n".format(*item_list)
 
-    def _reset_values(self):
+    def _write_list(self, ctx, fp, item_list):
         """
-		Reset values to convert another .plan file
+		Write a list representation of command items to file, skipping removed commands
+		Steps are numbered here so they always increase by one for each written command
 		"""
-        self.current_waypoint = []
-        self.home = []
-        self.home_flying_altitude = 0
-        self.current_step = 0
+        if item_list is not None:
+            item_list[0] = ctx.current_step
+            ctx.current_step += 1
+            fp.write(self._list_to_string(item_list))